@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from pathlib import Path
 
 from agents import Agent
@@ -86,6 +87,7 @@ Provide a short summary of what you changed.
 PROMPTS_DIR = Path(__file__).resolve().parent / "prompts"
 
 
+@lru_cache(maxsize=16)
 def _instructions_from_file(filename: str, default: str) -> str:
     text = read_text(PROMPTS_DIR / filename, required=False)
     if is_effectively_empty(text):
@@ -93,6 +95,18 @@ def _instructions_from_file(filename: str, default: str) -> str:
     return text.strip()
 
 
+# Resolve every role's instructions once at import so each agent gets a byte-stable
+# system prompt for the whole process. Use _instructions_from_file.cache_clear() to reload.
+for _filename, _default in (
+    ("planner.md", PLANNER_INSTRUCTIONS),
+    ("implementer.md", IMPLEMENTER_INSTRUCTIONS),
+    ("reviewer.md", REVIEWER_INSTRUCTIONS),
+    ("tech_writer.md", TECH_WRITER_INSTRUCTIONS),
+):
+    _instructions_from_file(_filename, _default)
+del _filename, _default
+
+
 def build_planner_agent() -> Agent:
     return Agent(
         name="Planner",
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple
+
+_APPEND = "a"
+_REPLACE = "w"
+_FLUSH = "f"
+
+APPEND_BUFFER_BYTES = 1 << 16
+
+
+class AsyncArtifactWriter:
+    """
+    Writes report files on a background thread so the orchestrator loop never waits on disk.
+
+    append() keeps one 64 KiB buffered append handle open per path, so small round logs
+    coalesce into few syscalls; replace() atomically swaps in the whole file, and queued
+    replaces of the same path collapse into the latest one. The handles belong to the
+    writer thread. Call flush() before anything reads the files back and close() when the
+    run is over.
+    """
+
+    def __init__(self) -> None:
+        self._queue: "queue.Queue[Optional[Tuple[Path, str, bytes, int]]]" = queue.Queue()
+        self._handles: Dict[Path, BinaryIO] = {}
+        self._latest: Dict[Path, int] = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+        self._thread.start()
+
+    def append(self, path: Path, data: bytes) -> None:
+        self._put(path, _APPEND, data)
+
+    def replace(self, path: Path, data: bytes) -> None:
+        self._put(path, _REPLACE, data)
+
+    def flush(self) -> None:
+        if self._closed:
+            # The writer thread is gone, so queue.join() would wait forever.
+            raise RuntimeError("AsyncArtifactWriter is closed")
+        self._queue.put((Path(), _FLUSH, b"", 0))
+        self._queue.join()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _put(self, path: Path, mode: str, data: bytes) -> None:
+        if self._closed:
+            raise RuntimeError("AsyncArtifactWriter is closed")
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            if mode == _REPLACE:
+                self._latest[path] = seq
+        self._queue.put((path, mode, data, seq))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    self._close_handles()
+                    return
+                path, mode, data, seq = item
+                if mode == _APPEND:
+                    self._append_handle(path).write(data)
+                elif mode == _FLUSH:
+                    for handle in self._handles.values():
+                        handle.flush()
+                else:
+                    with self._lock:
+                        stale = self._latest.get(path) != seq
+                    if not stale:
+                        _replace_file(path, data)
+            except BaseException as exc:  # noqa: BLE001 - surfaced on flush()/close()
+                self._error = exc
+            finally:
+                self._queue.task_done()
+
+    def _append_handle(self, path: Path) -> BinaryIO:
+        handle = self._handles.get(path)
+        if handle is None:
+            handle = open(path, "ab", buffering=APPEND_BUFFER_BYTES)
+            self._handles[path] = handle
+        return handle
+
+    def _close_handles(self) -> None:
+        for handle in self._handles.values():
+            try:
+                handle.close()
+            except OSError as exc:
+                self._error = exc
+        self._handles.clear()
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def _replace_file(path: Path, data: bytes) -> None:
+    # Write a sibling temp file and rename it over the target, so readers never see a partial file.
+    tmp_path = path.with_name(path.name + ".tmp")
+    # O_BINARY: on Windows a text-mode fd would write every "\n" as "\r\n".
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        _write_all(fd, data)
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, path)
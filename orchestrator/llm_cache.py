@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional
+
+from .utils import ensure_dir
+
+CACHE_ENV = "ORCH_LLM_CACHE"
+
+CACHE_DIR = Path(__file__).resolve().parents[1] / "project" / "reports" / ".cache"
+
+# Roles whose output is a pure function of their input. Implementer and tech writer
+# change files through tools, so replaying their text would skip those side effects.
+CACHEABLE_ROLES = {"planner", "reviewer"}
+
+
+def is_enabled(role: str) -> bool:
+    return role in CACHEABLE_ROLES and os.environ.get(CACHE_ENV, "").strip() == "1"
+
+
+def _entry_path(role: str, input_text: str, salt: str) -> Path:
+    digest = hashlib.blake2b(
+        (role + "\0" + salt + "\0" + input_text).encode("utf-8"),
+        digest_size=32,
+    ).hexdigest()
+    return CACHE_DIR / role / f"{digest}.txt"
+
+
+def get(role: str, input_text: str, *, salt: str = "") -> Optional[str]:
+    path = _entry_path(role, input_text, salt)
+    try:
+        return path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+
+
+def put(role: str, input_text: str, output: str, *, salt: str = "") -> None:
+    path = _entry_path(role, input_text, salt)
+    ensure_dir(path.parent)
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        tmp_path.write_text(output, encoding="utf-8")
+        os.replace(tmp_path, path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+        raise
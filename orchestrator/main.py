@@ -1,14 +1,20 @@
 from __future__ import annotations
 
+import asyncio
 import importlib
 import os
+import random
 import re
+import shlex
+import shutil
 import subprocess
+import tempfile
+import threading
 import time
 import traceback
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 try:
     from dotenv import load_dotenv
@@ -16,21 +22,46 @@ except ImportError:  # pragma: no cover - optional for local dev
     def load_dotenv(*_args, **_kwargs) -> bool:
         return False
 
-from .models import RunContext
+from . import llm_cache
+from .models import Artifacts, ProjectContext, RunContext
 from .policies import (
+    MAX_PARALLEL_AGENTS,
     MAX_ROUNDS,
     ReviewDecision,
-    is_stuck,
+    is_stuck_hash,
     max_turns_for_role,
     model_for_role,
     parse_reviewer_output,
     retry_base_delay_seconds,
     retry_max_attempts_for_role,
     retry_max_delay_seconds,
+    review_hash,
 )
 from .reporting import RunReport, create_run_dir
 from .utils import is_effectively_empty, read_text
 
+_RETRYABLE: List[type] = []
+try:
+    import openai
+except ImportError:  # pragma: no cover - reported by main_async()
+    pass
+else:
+    _RETRYABLE += [openai.APIConnectionError, openai.APITimeoutError, openai.RateLimitError, openai.InternalServerError]
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional transport
+    pass
+else:
+    _RETRYABLE += [httpx.TimeoutException, httpx.TransportError]
+try:
+    import httpcore
+except ImportError:  # pragma: no cover - optional transport
+    pass
+else:
+    _RETRYABLE += [httpcore.TimeoutException, httpcore.NetworkError, httpcore.RemoteProtocolError]
+_RETRYABLE_EXCEPTIONS: Tuple[type, ...] = tuple(_RETRYABLE)
+del _RETRYABLE
+
 DEMO_TASK = """Create a tiny Python package inside workspace/:
 - app/greeter.py with a greet(name: str) -> str function
 - pytest tests for greet
@@ -39,58 +70,54 @@ DEMO_TASK = """Create a tiny Python package inside workspace/:
 """
 
 
+_AGENT_SLOTS = asyncio.Semaphore(MAX_PARALLEL_AGENTS)
+
+
 def _load_optional(path: Path) -> str:
     return read_text(path, required=False)
 
 
-def _truncate_for_prompt(text: str, max_chars: int, *, label: str) -> str:
+def _truncate(text: str, max_chars: int, *, label: Optional[str] = None) -> str:
+    # Returns text itself when it fits, so callers can run it every round without copying.
     if max_chars <= 0:
         return ""
     if len(text) <= max_chars:
         return text
-    return text[:max_chars].rstrip() + f"\n\n...[{label} truncated to {max_chars} chars]"
-
-
-def _build_planner_input(task: str, backlog: str, vision: str, architecture: str, conventions: str) -> str:
-    return (
-        "VISION:\n"
-        f"{vision.strip()}\n\n"
-        "ARCHITECTURE:\n"
-        f"{architecture.strip()}\n\n"
-        "CONVENTIONS:\n"
-        f"{conventions.strip()}\n\n"
-        "BACKLOG:\n"
-        f"{backlog.strip()}\n\n"
-        "TASK:\n"
-        f"{task.strip()}\n"
-    )
+    marker = f"{label} truncated" if label else "truncated"
+    return text[:max_chars].rstrip() + f"\n\n...[{marker} to {max_chars} chars]"
+
+
+def _build_planner_input(task: str, backlog: str, project: ProjectContext) -> str:
+    # Static project context goes first so consecutive runs share a cacheable prompt prefix.
+    # ProjectContext fields are stripped at load time; only per-call text is stripped here.
+    return "".join((
+        "CONVENTIONS:\n", project.conventions, "\n\n",
+        "ARCHITECTURE:\n", project.architecture, "\n\n",
+        "VISION:\n", project.vision, "\n\n",
+        "BACKLOG:\n", backlog.strip(), "\n\n",
+        "TASK:\n", task.strip(), "\n",
+    ))
 
 
 def _build_implementer_input(
     task: str,
     plan: str,
     fixes: Optional[List[str]],
-    architecture: str,
-    conventions: str,
+    project: ProjectContext,
 ) -> str:
+    # Blocks that stay identical across rounds come first; REVIEW_FIXES changes every round.
     fixes_block = "\n".join(f"- {fix}" for fix in fixes) if fixes else "- None"
-    return (
-        "ARCHITECTURE:\n"
-        f"{architecture.strip()}\n\n"
-        "CONVENTIONS:\n"
-        f"{conventions.strip()}\n\n"
-        "TASK:\n"
-        f"{task.strip()}\n\n"
-        "PLAN:\n"
-        f"{plan.strip()}\n\n"
-        "REVIEW_FIXES:\n"
-        f"{fixes_block}\n"
-    )
+    return "".join((
+        "CONVENTIONS:\n", project.conventions, "\n\n",
+        "ARCHITECTURE:\n", project.architecture, "\n\n",
+        "PLAN:\n", plan.strip(), "\n\n",
+        "TASK:\n", task.strip(), "\n\n",
+        "REVIEW_FIXES:\n", fixes_block, "\n",
+    ))
 
 
 def _build_reviewer_input(
-    architecture: str,
-    conventions: str,
+    project: ProjectContext,
     task: str,
     plan: str,
     red_flags: str,
@@ -98,50 +125,39 @@ def _build_reviewer_input(
     tool_outputs: str,
     implementer_report: str,
 ) -> str:
-    return (
-        "ARCHITECTURE:\n"
-        f"{architecture.strip()}\n\n"
-        "CONVENTIONS:\n"
-        f"{conventions.strip()}\n\n"
-        "TASK:\n"
-        f"{task.strip()}\n\n"
-        "PLAN:\n"
-        f"{plan.strip()}\n\n"
-        "RED_FLAGS:\n"
-        f"{red_flags.strip()}\n\n"
-        "DIFF:\n"
-        f"{diff_text.strip()}\n\n"
-        "TOOL_OUTPUTS:\n"
-        f"{tool_outputs.strip()}\n\n"
-        "IMPLEMENTER_REPORT:\n"
-        f"{implementer_report.strip()}\n"
-    )
-
-
-def _build_tech_writer_input(vision: str, architecture: str, conventions: str, task: str, plan: str, reviewer: ReviewDecision) -> str:
-    return (
-        "VISION:\n"
-        f"{vision.strip()}\n\n"
-        "ARCHITECTURE:\n"
-        f"{architecture.strip()}\n\n"
-        "CONVENTIONS:\n"
-        f"{conventions.strip()}\n\n"
-        "TASK:\n"
-        f"{task.strip()}\n\n"
-        "PLAN:\n"
-        f"{plan.strip()}\n\n"
-        "REVIEW:\n"
-        f"{reviewer.raw.strip()}\n"
-    )
+    # Blocks that stay identical across rounds come first; per-round evidence follows.
+    return "".join((
+        "CONVENTIONS:\n", project.conventions, "\n\n",
+        "ARCHITECTURE:\n", project.architecture, "\n\n",
+        "PLAN:\n", plan.strip(), "\n\n",
+        "TASK:\n", task.strip(), "\n\n",
+        "RED_FLAGS:\n", red_flags.strip(), "\n\n",
+        "DIFF:\n", diff_text.strip(), "\n\n",
+        "TOOL_OUTPUTS:\n", tool_outputs.strip(), "\n\n",
+        "IMPLEMENTER_REPORT:\n", implementer_report.strip(), "\n",
+    ))
+
+
+def _build_tech_writer_input(project: ProjectContext, task: str, plan: str, reviewer: ReviewDecision) -> str:
+    return "".join((
+        "CONVENTIONS:\n", project.conventions, "\n\n",
+        "ARCHITECTURE:\n", project.architecture, "\n\n",
+        "VISION:\n", project.vision, "\n\n",
+        "PLAN:\n", plan.strip(), "\n\n",
+        "TASK:\n", task.strip(), "\n\n",
+        "REVIEW:\n", reviewer.raw.strip(), "\n",
+    ))
 
 
 def _collect_tool_events(ctx: RunContext) -> Dict[str, Any]:
-    commands = [event for event in ctx.tool_events if event.get("tool") == "run_cmd"]
-    files_written = [event for event in ctx.tool_events if event.get("tool") == "fs_write"]
+    events = list(ctx.tool_events)
+    commands = [event for event in events if event.get("tool") == "run_cmd"]
+    files_written = [event for event in events if event.get("tool") == "fs_write"]
     return {
         "commands": commands,
         "files_written": files_written,
-        "events": ctx.tool_events,
+        "events": events,
+        "events_dropped": ctx.events_dropped,
     }
 
 
@@ -149,39 +165,35 @@ def _needs_docs_update(decision: ReviewDecision) -> bool:
     return any(fix.strip().upper().startswith("DOCS:") for fix in decision.fixes)
 
 
-def _format_tool_outputs(events: List[Dict[str, Any]]) -> str:
-    run_cmd_events = [e for e in events if e.get("tool") == "run_cmd"]
-    fs_write_events = [e for e in events if e.get("tool") == "fs_write"]
-
-    lines: List[str] = []
-    if fs_write_events:
-        lines.append("FILES_WRITTEN:")
-        for e in fs_write_events:
-            lines.append(f"- {e.get('path')}")
-    if run_cmd_events:
-        lines.append("COMMAND_RESULTS:")
-        for e in run_cmd_events:
+def _format_tool_outputs(events: Iterable[Dict[str, Any]]) -> str:
+    files_written: List[str] = []
+    command_results: List[str] = []
+    for e in events:
+        tool = e.get("tool")
+        if tool == "fs_write":
+            files_written.append(f"- {e.get('path')}")
+        elif tool == "run_cmd":
             cmd = (e.get("cmd") or "").strip()
             rc = e.get("returncode")
             blocked = bool(e.get("blocked"))
-            lines.append(f"- {cmd} -> {rc}{' (BLOCKED)' if blocked else ''}")
+            command_results.append(f"- {cmd} -> {rc}{' (BLOCKED)' if blocked else ''}")
             stderr = (e.get("stderr") or "").strip()
             if stderr:
                 snippet = stderr if len(stderr) <= 400 else (stderr[:400] + "...<truncated>")
-                lines.append(f"  stderr: {snippet}")
+                command_results.append(f"  stderr: {snippet}")
+
+    lines: List[str] = []
+    if files_written:
+        lines.append("FILES_WRITTEN:")
+        lines.extend(files_written)
+    if command_results:
+        lines.append("COMMAND_RESULTS:")
+        lines.extend(command_results)
     if not lines:
         return "- None"
     return "\n".join(lines)
 
 
-def _truncate(text: str, limit: int) -> str:
-    if limit <= 0:
-        return ""
-    if len(text) <= limit:
-        return text
-    return text[:limit].rstrip() + f"\n\n...[truncated to {limit} chars]"
-
-
 _RED_FLAG_PATTERNS = [
     ("InMemoryClass", re.compile(r"\bInMemory[A-Za-z0-9_]*\b")),
     ("SQLiteMemory", re.compile(r":memory:")),
@@ -247,35 +259,122 @@ def _scan_red_flags(workspace_dir: Path) -> Tuple[str, Dict[str, Any]]:
     return ("\n".join(hits), meta)
 
 
-def _run_local_cmd(args: List[str], *, cwd: Path, timeout_seconds: int) -> Dict[str, Any]:
+LOCAL_CMD_PREVIEW_BYTES = 8192
+
+
+def _decode_prefix(data: bytes, max_chars: int) -> str:
+    # A UTF-8 char is at most 4 bytes, so this prefix holds max_chars + 1 chars whenever data is longer,
+    # which keeps "needs truncation" detectable without decoding the whole buffer.
+    return data[: (max_chars + 1) * 4].decode("utf-8", errors="replace")
+
+
+def _drain_stream(stream, buffer: bytearray, totals: Dict[str, int], name: str, cap: Optional[int]) -> None:
+    # Keep reading past the cap so the child never blocks on a full pipe; only the kept bytes grow.
+    for chunk in iter(lambda: stream.read1(65536), b""):
+        totals[name] += len(chunk)
+        if cap is None:
+            buffer += chunk
+        elif len(buffer) < cap:
+            buffer += chunk[: cap - len(buffer)]
+    stream.close()
+
+
+def _feed_stdin(stream, data: bytes) -> None:
+    try:
+        stream.write(data)
+        stream.close()
+    except (BrokenPipeError, ValueError):
+        pass  # the command exited (or was killed) without reading everything
+
+
+def _run_local_cmd(
+    args: List[str],
+    *,
+    cwd: Path,
+    timeout_seconds: int,
+    max_output_bytes: Optional[int] = None,
+    stdout_as_bytes: bool = False,
+    stdin_bytes: Optional[bytes] = None,
+    env: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    Runs a local command and captures stdout/stderr as bytes, decoding once at the end.
+
+    With max_output_bytes set, at most that many bytes are kept per stream (use it for
+    commands whose output only feeds _cmd_meta previews); stdout_len/stderr_len always
+    report the full size. With stdout_as_bytes, stdout is returned undecoded.
+    stdin_bytes, if given, is fed to the command's stdin (e.g. --pathspec-from-file=-).
+    env, if given, replaces the inherited environment.
+    """
+    cmd = shlex.join(args)
     try:
-        result = subprocess.run(
+        proc = subprocess.Popen(
             args,
             cwd=str(cwd),
-            capture_output=True,
-            text=True,
-            timeout=timeout_seconds,
+            stdin=subprocess.PIPE if stdin_bytes is not None else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
         )
-        return {
-            "cmd": " ".join(args),
-            "returncode": result.returncode,
-            "stdout": result.stdout or "",
-            "stderr": result.stderr or "",
-        }
     except FileNotFoundError:
         return {
-            "cmd": " ".join(args),
+            "cmd": cmd,
             "returncode": 127,
             "stdout": "",
             "stderr": "COMMAND_NOT_FOUND",
         }
-    except subprocess.TimeoutExpired as exc:
+    except OSError as exc:
+        # E.g. E2BIG: the command could not be started at all.
+        return {
+            "cmd": cmd,
+            "returncode": 126,
+            "stdout": b"" if stdout_as_bytes else "",
+            "stderr": f"{type(exc).__name__}: {exc}",
+        }
+
+    buffers = {"stdout": bytearray(), "stderr": bytearray()}
+    totals = {"stdout": 0, "stderr": 0}
+    readers = [
+        threading.Thread(
+            target=_drain_stream,
+            args=(stream, buffers[name], totals, name, max_output_bytes),
+            daemon=True,
+        )
+        for name, stream in (("stdout", proc.stdout), ("stderr", proc.stderr))
+    ]
+    if stdin_bytes is not None:
+        # Written from a thread too, so a child that stops reading can't outlast the timeout.
+        readers.append(threading.Thread(target=_feed_stdin, args=(proc.stdin, stdin_bytes), daemon=True))
+    for reader in readers:
+        reader.start()
+
+    timed_out = False
+    try:
+        returncode = proc.wait(timeout=timeout_seconds)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+        timed_out = True
+    for reader in readers:
+        reader.join()
+
+    stdout: str | bytes = bytes(buffers["stdout"]) if stdout_as_bytes else buffers["stdout"].decode("utf-8", errors="replace")
+    if timed_out:
         return {
-            "cmd": " ".join(args),
+            "cmd": cmd,
             "returncode": 124,
-            "stdout": exc.stdout or "",
+            "stdout": stdout,
             "stderr": f"TIMEOUT after {timeout_seconds}s",
+            "stdout_len": totals["stdout"],
         }
+    return {
+        "cmd": cmd,
+        "returncode": returncode,
+        "stdout": stdout,
+        "stderr": buffers["stderr"].decode("utf-8", errors="replace"),
+        "stdout_len": totals["stdout"],
+        "stderr_len": totals["stderr"],
+    }
 
 
 def _cmd_meta(result: Dict[str, Any], *, limit: int = 800) -> Dict[str, Any]:
@@ -287,6 +386,8 @@ def _cmd_meta(result: Dict[str, Any], *, limit: int = 800) -> Dict[str, Any]:
         return (text[:max_chars] + "...<truncated>", True)
 
     stdout_raw = result.get("stdout") or ""
+    if isinstance(stdout_raw, bytes):
+        stdout_raw = _decode_prefix(stdout_raw, limit)
     stderr_raw = result.get("stderr") or ""
     stdout_preview, stdout_truncated = _truncate_stdio(stdout_raw, limit)
     stderr_preview, stderr_truncated = _truncate_stdio(stderr_raw, limit)
@@ -295,33 +396,98 @@ def _cmd_meta(result: Dict[str, Any], *, limit: int = 800) -> Dict[str, Any]:
         "returncode": result.get("returncode"),
         "stdout": stdout_preview,
         "stderr": stderr_preview,
-        "stdout_len": len(stdout_raw),
-        "stderr_len": len(stderr_raw),
+        "stdout_len": result.get("stdout_len", len(stdout_raw)),
+        "stderr_len": result.get("stderr_len", len(stderr_raw)),
         "stdout_truncated": stdout_truncated,
         "stderr_truncated": stderr_truncated,
     }
 
 
-def _compute_workspace_diff(repo_root: Path, workspace_dir: Path) -> Tuple[str, Dict[str, Any]]:
+# `git rev-parse --show-toplevel` results per probed directory (successes and "not a git repository"
+# only); the layout does not change during a run.
+_GIT_TOPLEVEL_CACHE: Dict[str, Optional[Path]] = {}
+
+# Scoped diffs pass each path on argv to git status/ls-files/diff; past this many, diff all of
+# workspace/ instead so the command line stays far below E2BIG (and ~32K chars on Windows).
+DIFF_SCOPE_MAX_PATHS = 64
+
+
+def _is_relative_to(path: Path, parent: Path) -> bool:
+    try:
+        path.relative_to(parent)
+        return True
+    except ValueError:
+        return False
+
+
+def _compute_workspace_diff(
+    repo_root: Path,
+    workspace_dir: Path,
+    changed_paths: Optional[Sequence[str]] = None,
+) -> Tuple[bytes, Dict[str, Any]]:
     """
-    Produces a patch-like diff for workspace/ using git.
+    Produces a patch-like diff for workspace/ using git, as raw bytes.
 
-    Includes:
-    - tracked changes via `git diff`
-    - untracked new files via `git diff --no-index /dev/null <file>`
+    If changed_paths (absolute paths) is given, git only looks at those files
+    instead of the whole workspace/ tree; paths outside workspace/ are ignored.
+    More than DIFF_SCOPE_MAX_PATHS paths, or a scoped git command that could not
+    be started (126/127), fall back to diffing all of workspace/.
+    """
+    fallback: Optional[str] = None
+    if changed_paths and len(changed_paths) > DIFF_SCOPE_MAX_PATHS:
+        fallback = "too_many_paths"
+    elif changed_paths:
+        diff, meta = _diff_workspace(repo_root, workspace_dir, changed_paths)
+        if not (meta.get("scoped_paths") and meta.get("pathspec_failed")):
+            return (diff, meta)
+        fallback = "scoped_command_failed"
+    diff, meta = _diff_workspace(repo_root, workspace_dir, None)
+    if fallback is not None:
+        meta["scope_fallback"] = fallback
+    return (diff, meta)
+
+
+def _diff_workspace(
+    repo_root: Path,
+    workspace_dir: Path,
+    changed_paths: Optional[Sequence[str]],
+) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Runs git for _compute_workspace_diff, scoped to changed_paths when given.
+
+    Includes tracked changes and untracked new files in a single `git diff`:
+    untracked files are marked with `git add --intent-to-add` in a throwaway
+    copy of the index (GIT_INDEX_FILE), so the user's index is never touched.
+    If git refuses that, new files are diffed one by one with
+    `git diff --no-index` instead.
+
+    meta["pathspec_failed"] is set when a command carrying the pathspec could not
+    be started (returncode 126/127).
     """
     meta: Dict[str, Any] = {"available": False, "commands": [], "probes": []}
 
     def _git_toplevel(cwd: Path, *, label: str) -> Path | None:
-        probe = _run_local_cmd(["git", "rev-parse", "--show-toplevel"], cwd=cwd, timeout_seconds=5)
+        key = str(cwd)
+        if key in _GIT_TOPLEVEL_CACHE:
+            cached = _GIT_TOPLEVEL_CACHE[key]
+            meta["commands"].append({"cmd": "git rev-parse --show-toplevel", "cached": True, "tool": "local_cmd", "cwd": key})
+            meta["probes"].append({"label": label, "cwd": key, "cached": True, "toplevel": str(cached) if cached else None})
+            return cached
+        probe = _run_local_cmd(
+            ["git", "rev-parse", "--show-toplevel"],
+            cwd=cwd,
+            timeout_seconds=5,
+            max_output_bytes=LOCAL_CMD_PREVIEW_BYTES,
+        )
         meta["commands"].append({**_cmd_meta(probe), "tool": "local_cmd", "cwd": str(cwd)})
         meta["probes"].append({"label": label, "cwd": str(cwd), **_cmd_meta(probe)})
-        if probe["returncode"] != 0:
-            return None
-        raw = (probe.get("stdout") or "").strip()
-        if not raw:
-            return None
-        return Path(raw).resolve()
+        raw = (probe.get("stdout") or "").strip() if probe["returncode"] == 0 else ""
+        toplevel = Path(raw).resolve() if raw else None
+        # Only definite answers are cached: 128 is git's "not a git repository"; a timeout (124),
+        # a missing git (127) or any other failure may be transient, so the next round probes again.
+        if toplevel is not None or probe["returncode"] == 128:
+            _GIT_TOPLEVEL_CACHE[key] = toplevel
+        return toplevel
 
     # Prefer probing from workspace/ because it supports both layouts:
     # - workspace/ is its own git repo (product repo lives inside workspace/)
@@ -330,13 +496,13 @@ def _compute_workspace_diff(repo_root: Path, workspace_dir: Path) -> Tuple[str,
     if workspace_top is None:
         workspace_top = _git_toplevel(repo_root, label="repo_root")
     if workspace_top is None:
-        return ("- None", meta)
+        return (b"- None", meta)
 
     git_cwd = workspace_top
     try:
         workspace_rel = os.path.relpath(workspace_dir.resolve(), workspace_top.resolve())
     except ValueError:
-        return ("- None", meta)
+        return (b"- None", meta)
 
     if workspace_rel == ".":
         pathspec: List[str] = ["."]
@@ -347,48 +513,153 @@ def _compute_workspace_diff(repo_root: Path, workspace_dir: Path) -> Tuple[str,
     meta["git_toplevel"] = str(workspace_top)
     meta["workspace_pathspec"] = workspace_rel
 
+    if changed_paths:
+        workspace_resolved = workspace_dir.resolve()
+        scoped: List[str] = []
+        for raw_path in changed_paths:
+            resolved = Path(raw_path).resolve()
+            if not _is_relative_to(resolved, workspace_resolved):
+                continue
+            scoped.append(":(literal)" + os.path.relpath(resolved, workspace_top))
+        if scoped:
+            pathspec = scoped
+            meta["scoped_paths"] = len(scoped)
+
     meta["available"] = True
-    diff_parts: List[str] = []
+    diff_parts: List[bytes] = []
 
-    status = _run_local_cmd(["git", "status", "--porcelain", "--", *pathspec], cwd=git_cwd, timeout_seconds=10)
+    status = _run_local_cmd(
+        ["git", "status", "--porcelain", "--", *pathspec],
+        cwd=git_cwd,
+        timeout_seconds=10,
+        stdout_as_bytes=True,
+    )
     meta["commands"].append({**_cmd_meta(status), "tool": "local_cmd", "cwd": str(git_cwd)})
-    status_out = (status.get("stdout") or "").rstrip()
+    if status["returncode"] in (126, 127):
+        meta["pathspec_failed"] = True
+    status_out = (status.get("stdout") or b"").rstrip()
     if status_out:
-        diff_parts.append("# GIT STATUS (workspace)\n" + status_out)
-
-    tracked = _run_local_cmd(["git", "diff", "--no-color", "--", *pathspec], cwd=git_cwd, timeout_seconds=30)
-    meta["commands"].append({**_cmd_meta(tracked), "tool": "local_cmd", "cwd": str(git_cwd)})
-    tracked_out = (tracked.get("stdout") or "").rstrip()
-    if tracked_out:
-        diff_parts.append("# GIT DIFF (workspace)\n" + tracked_out)
+        diff_parts.append(b"# GIT STATUS (workspace)\n" + status_out)
 
     untracked = _run_local_cmd(
-        ["git", "ls-files", "--others", "--exclude-standard", "--", *pathspec],
+        ["git", "ls-files", "-z", "--others", "--exclude-standard", "--", *pathspec],
         cwd=git_cwd,
         timeout_seconds=10,
+        stdout_as_bytes=True,
     )
     meta["commands"].append({**_cmd_meta(untracked), "tool": "local_cmd", "cwd": str(git_cwd)})
-    untracked_files = sorted([line.strip() for line in (untracked.get("stdout") or "").splitlines() if line.strip()])
-
-    null_path = "/dev/null" if Path("/dev/null").exists() else "NUL"
-    for rel_path in untracked_files:
-        patch = _run_local_cmd(
-            ["git", "diff", "--no-color", "--no-index", "--", null_path, rel_path],
+    if untracked["returncode"] in (126, 127):
+        meta["pathspec_failed"] = True
+    # -z keeps names unquoted (core.quotePath); :(literal) stops git from globbing them.
+    untracked_files = sorted(os.fsdecode(name) for name in (untracked.get("stdout") or b"").split(b"\0") if name)
+    # Fed on stdin, NUL-separated: thousands of names would overflow argv (E2BIG, or ~32K on Windows).
+    untracked_specs = b"".join(b":(literal)" + os.fsencode(name) + b"\0" for name in untracked_files)
+
+    # Register untracked files as intent-to-add so one `git diff` covers tracked and new files.
+    # That happens in a temporary copy of the index: the real one (and whatever the user staged
+    # in it) is never modified, and an interrupted run leaves nothing behind.
+    with tempfile.TemporaryDirectory(prefix="orch-index-") as index_dir:
+        diff_env: Optional[Dict[str, str]] = None
+        intent_ok = True
+        if untracked_files:
+            diff_env = _temp_index_env(git_cwd, Path(index_dir) / "index", meta)
+            intent_ok = diff_env is not None
+        if diff_env is not None:
+            intent = _run_local_cmd(
+                ["git", "add", "--intent-to-add", "--pathspec-from-file=-", "--pathspec-file-nul"],
+                cwd=git_cwd,
+                timeout_seconds=10,
+                max_output_bytes=LOCAL_CMD_PREVIEW_BYTES,
+                stdin_bytes=untracked_specs,
+                env=diff_env,
+            )
+            meta["commands"].append({**_cmd_meta(intent), "tool": "local_cmd", "cwd": str(git_cwd)})
+            intent_ok = intent["returncode"] == 0
+            if not intent_ok:
+                # Diff against the real index instead; new files are diffed one by one below.
+                diff_env = None
+
+        combined = _run_local_cmd(
+            ["git", "diff", "--no-color", "--", *pathspec],
             cwd=git_cwd,
             timeout_seconds=30,
+            stdout_as_bytes=True,
+            env=diff_env,
         )
-        meta["commands"].append({**_cmd_meta(patch), "tool": "local_cmd", "cwd": str(git_cwd)})
-        patch_out = (patch.get("stdout") or "").rstrip()
-        if patch_out:
-            diff_parts.append("# NEW FILE (untracked)\n" + patch_out)
+        meta["commands"].append({**_cmd_meta(combined), "tool": "local_cmd", "cwd": str(git_cwd)})
+        if combined["returncode"] in (126, 127):
+            meta["pathspec_failed"] = True
+
+    combined_out = (combined.get("stdout") or b"").rstrip()
+    if combined_out:
+        header = b"# GIT DIFF (workspace, including untracked files)\n" if intent_ok else b"# GIT DIFF (workspace)\n"
+        diff_parts.append(header + combined_out)
+
+    if not intent_ok:
+        null_path = "/dev/null" if Path("/dev/null").exists() else "NUL"
+        for rel_path in untracked_files:
+            patch = _run_local_cmd(
+                ["git", "diff", "--no-color", "--no-index", "--", null_path, rel_path],
+                cwd=git_cwd,
+                timeout_seconds=30,
+                stdout_as_bytes=True,
+            )
+            meta["commands"].append({**_cmd_meta(patch), "tool": "local_cmd", "cwd": str(git_cwd)})
+            patch_out = (patch.get("stdout") or b"").rstrip()
+            if patch_out:
+                diff_parts.append(b"# NEW FILE (untracked)\n" + patch_out)
 
     if not diff_parts:
-        return ("- None", meta)
+        return (b"- None", meta)
+
+    return (b"\n\n".join(diff_parts).rstrip() + b"\n", meta)
+
+
+def _temp_index_env(git_cwd: Path, temp_index: Path, meta: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """
+    Copies the repository's index to temp_index and returns an environment pointing git at it,
+    or None if the index location can't be determined or copied.
+    """
+    probe = _run_local_cmd(
+        ["git", "rev-parse", "--git-path", "index"],
+        cwd=git_cwd,
+        timeout_seconds=5,
+        max_output_bytes=LOCAL_CMD_PREVIEW_BYTES,
+    )
+    meta["commands"].append({**_cmd_meta(probe), "tool": "local_cmd", "cwd": str(git_cwd)})
+    raw = (probe.get("stdout") or "").strip() if probe["returncode"] == 0 else ""
+    if not raw:
+        return None
+    index_path = git_cwd / raw
+    try:
+        # copy2 keeps the mtime, which git's racy-entry check compares cached stat data against.
+        shutil.copy2(index_path, temp_index)
+    except FileNotFoundError:
+        pass  # no index yet (nothing ever staged): git starts the copy from scratch
+    except OSError as exc:
+        meta["index_copy_error"] = f"{type(exc).__name__}: {exc}"
+        return None
+    return {**os.environ, "GIT_INDEX_FILE": str(temp_index)}
 
-    return ("\n\n".join(diff_parts).rstrip() + "\n", meta)
+
+def _llm_cache_get(role: str, input_text: str, salt: str, errors: List[str]) -> Optional[str]:
+    # The cache is a debugging aid: an unreadable or corrupt entry is a miss, never a failure.
+    try:
+        return llm_cache.get(role, input_text, salt=salt)
+    except (OSError, UnicodeDecodeError) as exc:
+        errors.append(f"get: {type(exc).__name__}: {exc}")
+        return None
 
 
-def _safe_run(
+def _llm_cache_put(role: str, input_text: str, output: str, salt: str, errors: List[str]) -> None:
+    # Runs after the model call succeeded; a failed write must not discard that response.
+    try:
+        llm_cache.put(role, input_text, output, salt=salt)
+    except OSError as exc:
+        errors.append(f"put: {type(exc).__name__}: {exc}")
+
+
+async def _safe_run_async(
     agent,
     input_text: str,
     max_turns: int,
@@ -402,52 +673,36 @@ def _safe_run(
 
     errors: List[Dict[str, Any]] = []
 
-    def is_retryable(exc: Exception) -> bool:
-        try:
-            import openai
-        except Exception:  # noqa: BLE001
-            openai = None  # type: ignore[assignment]
-        try:
-            import httpx
-        except Exception:  # noqa: BLE001
-            httpx = None  # type: ignore[assignment]
-        try:
-            import httpcore
-        except Exception:  # noqa: BLE001
-            httpcore = None  # type: ignore[assignment]
-
-        if openai is not None:
-            retryable = (
-                openai.APIConnectionError,
-                openai.APITimeoutError,
-                openai.RateLimitError,
-                openai.InternalServerError,
-            )
-            if isinstance(exc, retryable):
-                return True
-
-        if httpx is not None:
-            if isinstance(exc, (httpx.TimeoutException, httpx.TransportError)):
-                return True
-
-        if httpcore is not None:
-            if isinstance(exc, (httpcore.TimeoutException, httpcore.NetworkError, httpcore.RemoteProtocolError)):
-                return True
-
-        return False
+    use_cache = llm_cache.is_enabled(role)
+    cache_salt = f"{getattr(agent, 'model', '')}\0{getattr(agent, 'instructions', '')}"
+    cache_errors: List[str] = []
+    if use_cache:
+        cached = _llm_cache_get(role, input_text, cache_salt, cache_errors)
+        if cached is not None:
+            meta = {
+                "role": role,
+                "attempts": 0,
+                "max_attempts": max_attempts,
+                "base_delay_seconds": base_delay,
+                "max_delay_seconds": max_delay,
+                "errors": errors,
+                "cache": "hit",
+            }
+            return (cached, None, meta)
 
-    last_error: Optional[str] = None
+    last_exc: Optional[BaseException] = None
 
     for attempt in range(1, max_attempts + 1):
         try:
             from agents import Runner
 
-            result = Runner.run_sync(
-                agent,
-                input=input_text,
-                max_turns=max_turns,
-                context=context,
-            )
+            async with _AGENT_SLOTS:
+                result = await Runner.run(
+                    agent,
+                    input=input_text,
+                    max_turns=max_turns,
+                    context=context,
+                )
             meta = {
                 "role": role,
                 "attempts": attempt,
@@ -456,10 +711,16 @@ def _safe_run(
                 "max_delay_seconds": max_delay,
                 "errors": errors,
             }
-            return (result.final_output or "", None, meta)
+            output = result.final_output or ""
+            if use_cache:
+                _llm_cache_put(role, input_text, output, cache_salt, cache_errors)
+                meta["cache"] = "miss"
+                if cache_errors:
+                    meta["cache_errors"] = cache_errors
+            return (output, None, meta)
         except Exception as exc:  # noqa: BLE001
-            retryable = is_retryable(exc)
-            last_error = f"{type(exc).__name__}: {exc}\n{traceback.format_exc()}"
+            retryable = isinstance(exc, _RETRYABLE_EXCEPTIONS)
+            last_exc = exc
             errors.append(
                 {
                     "attempt": attempt,
@@ -470,10 +731,15 @@ def _safe_run(
             if (not retryable) or attempt >= max_attempts:
                 break
 
-            delay = min(max_delay, base_delay * (2 ** (attempt - 1)))
+            # Jitter keeps agents that hit the same rate limit from retrying in lockstep.
+            delay = min(max_delay, base_delay * (2 ** (attempt - 1))) * (0.5 + random.random())
             errors[-1]["sleep_seconds"] = delay
-            time.sleep(delay)
+            await asyncio.sleep(delay)
 
+    # Only the terminal failure needs a formatted traceback; retried attempts keep the short form in errors.
+    last_error = None
+    if last_exc is not None:
+        last_error = f"{type(last_exc).__name__}: {last_exc}\n{''.join(traceback.format_exception(last_exc))}"
     meta = {
         "role": role,
         "attempts": len(errors),
@@ -485,7 +751,8 @@ def _safe_run(
     return ("", last_error, meta)
 
 
-def main() -> int:
+async def main_async() -> int:
+    run_start_ns = time.monotonic_ns()
     repo_root = Path(__file__).resolve().parents[1]
     load_dotenv(repo_root / ".env")
 
@@ -494,10 +761,31 @@ def main() -> int:
 
     print(f"Reports: {run_dir}")
 
-    artifacts: Dict[str, Any] = {
+    try:
+        exit_code = await _run_pipeline(repo_root, run_dir, report, run_start_ns)
+    except BaseException:
+        # A report-writer failure must not replace the pipeline's own exception.
+        try:
+            report.close()
+        except Exception:  # noqa: BLE001
+            traceback.print_exc()
+        raise
+    report.close()
+    return exit_code
+
+
+async def _run_pipeline(repo_root: Path, run_dir: Path, report: RunReport, run_start_ns: int) -> int:
+    rounds: List[Dict[str, Any]] = []
+    max_turns = {
+        "planner": max_turns_for_role("planner"),
+        "implementer": max_turns_for_role("implementer"),
+        "reviewer": max_turns_for_role("reviewer"),
+        "tech_writer": max_turns_for_role("tech_writer"),
+    }
+    artifacts: Artifacts = {
         "run_dir": str(run_dir),
         "started_at": datetime.now().isoformat(timespec="seconds"),
-        "rounds": [],
+        "rounds": rounds,
         "final_verdict": "FAIL",
         "final_action": "SKIP",
         "models": {
@@ -506,12 +794,7 @@ def main() -> int:
             "reviewer": model_for_role("reviewer"),
             "tech_writer": model_for_role("tech_writer"),
         },
-        "max_turns": {
-            "planner": max_turns_for_role("planner"),
-            "implementer": max_turns_for_role("implementer"),
-            "reviewer": max_turns_for_role("reviewer"),
-            "tech_writer": max_turns_for_role("tech_writer"),
-        },
+        "max_turns": max_turns,
     }
 
     api_key = os.environ.get("OPENAI_API_KEY")
@@ -546,21 +829,25 @@ def main() -> int:
         task_source = "demo"
     artifacts["task_source"] = task_source
 
-    vision = _load_optional(repo_root / "project" / "vision.md")
-    architecture = _load_optional(repo_root / "project" / "architecture.md")
-    conventions = _load_optional(repo_root / "project" / "conventions.md")
+    project = ProjectContext.from_texts(
+        vision=_load_optional(repo_root / "project" / "vision.md"),
+        architecture=_load_optional(repo_root / "project" / "architecture.md"),
+        conventions=_load_optional(repo_root / "project" / "conventions.md"),
+    )
     backlog_raw = _load_optional(repo_root / "project" / "tasks" / "backlog.md")
     backlog_max_chars = int(os.environ.get("ORCH_PLANNER_BACKLOG_MAX_CHARS", "8000"))
-    backlog = "" if is_effectively_empty(backlog_raw) else _truncate_for_prompt(backlog_raw, backlog_max_chars, label="BACKLOG")
+    backlog = "" if is_effectively_empty(backlog_raw) else _truncate(backlog_raw, backlog_max_chars, label="BACKLOG")
     artifacts["backlog_included"] = bool(backlog.strip())
     artifacts["backlog_max_chars"] = backlog_max_chars
+    red_flags_max_chars = int(os.environ.get("ORCH_REVIEWER_RED_FLAGS_MAX_CHARS", "4000"))
+    diff_max_chars = int(os.environ.get("ORCH_REVIEWER_DIFF_MAX_CHARS", "12000"))
 
     planner = build_planner_agent()
-    planner_input = _build_planner_input(task_text, backlog, vision, architecture, conventions)
-    plan_text, plan_error, plan_meta = _safe_run(
+    planner_input = _build_planner_input(task_text, backlog, project)
+    plan_text, plan_error, plan_meta = await _safe_run_async(
         planner,
         planner_input,
-        artifacts["max_turns"]["planner"],
+        max_turns["planner"],
         role="planner",
     )
     artifacts["planner_run"] = plan_meta
@@ -577,40 +864,49 @@ def main() -> int:
     reviewer = build_reviewer_agent()
     tech_writer = build_tech_writer_agent()
 
-    previous_reviewer_text = ""
+    previous_reviewer_hash: Optional[bytes] = None
     review_decision: Optional[ReviewDecision] = None
 
+    # Every file the implementer wrote during this run; the reviewer diff is scoped to these
+    # until it runs a shell command (whose effects on workspace/ can't be known from events)
+    # or events get evicted from the capped per-context buffer.
+    touched_paths: Dict[str, None] = {}
+    full_diff = False
+
     loop_exhausted = True
     for round_idx in range(1, MAX_ROUNDS + 1):
+        round_start_ns = time.monotonic_ns()
         implementer_ctx = RunContext(
             role="implementer",
             repo_root=repo_root,
             fs_base=repo_root / "workspace",
             allow_write=True,
             shell_cwd=repo_root / "workspace",
+            event_sink=report.event_sink("implementer", round_idx),
         )
         implementer_input = _build_implementer_input(
             task_text,
             plan_text,
             review_decision.fixes if review_decision else None,
-            architecture,
-            conventions,
+            project,
         )
-        implementer_report, impl_error, implementer_meta = _safe_run(
+        implementer_report, impl_error, implementer_meta = await _safe_run_async(
             implementer,
             implementer_input,
-            artifacts["max_turns"]["implementer"],
+            max_turns["implementer"],
             context=implementer_ctx,
             role="implementer",
         )
         round_record: Dict[str, Any] = {
             "round": round_idx,
+            "started_ns": round_start_ns - run_start_ns,
             "implementer_run": implementer_meta,
             "tool_events": _collect_tool_events(implementer_ctx),
         }
         if impl_error:
             artifacts["error"] = f"Implementer failed: {impl_error}"
-            artifacts["rounds"].append(round_record)
+            round_record["elapsed_ns"] = time.monotonic_ns() - round_start_ns
+            rounds.append(round_record)
             report.write_artifacts(artifacts)
             print(f"Round {round_idx}: FAIL SKIP")
             print("Verdict: FAIL")
@@ -619,16 +915,28 @@ def main() -> int:
         report.append_implementer(round_idx, implementer_report)
 
         tool_outputs = _format_tool_outputs(implementer_ctx.tool_events)
-
-        red_flags_text, red_flags_meta = _scan_red_flags(repo_root / "workspace")
-        red_flags_max_chars = int(os.environ.get("ORCH_REVIEWER_RED_FLAGS_MAX_CHARS", "4000"))
+        for event in implementer_ctx.tool_events:
+            if event.get("tool") == "fs_write":
+                touched_paths.setdefault(event["path"])
+            elif event.get("tool") == "run_cmd" and not event.get("blocked"):
+                full_diff = True
+        if implementer_ctx.events_dropped:
+            full_diff = True
+        diff_scope = None if full_diff else list(touched_paths)
+
+        (red_flags_text, red_flags_meta), (diff_bytes, diff_meta) = await asyncio.gather(
+            asyncio.to_thread(_scan_red_flags, repo_root / "workspace"),
+            asyncio.to_thread(_compute_workspace_diff, repo_root, repo_root / "workspace", diff_scope),
+        )
         reviewer_red_flags = _truncate(red_flags_text, red_flags_max_chars) if red_flags_text.strip() != "- None" else "- None"
 
-        diff_text, diff_meta = _compute_workspace_diff(repo_root, repo_root / "workspace")
-        diff_max_chars = int(os.environ.get("ORCH_REVIEWER_DIFF_MAX_CHARS", "12000"))
-        reviewer_diff = _truncate(diff_text, diff_max_chars) if diff_text.strip() != "- None" else "- None"
+        reviewer_diff = (
+            _truncate(_decode_prefix(diff_bytes, diff_max_chars), diff_max_chars)
+            if diff_bytes.strip() != b"- None"
+            else "- None"
+        )
         diff_path = run_dir / f"diff_round_{round_idx}.patch"
-        diff_path.write_text(diff_text, encoding="utf-8")
+        diff_path.write_bytes(diff_bytes)
         round_record["diff"] = {
             "path": str(diff_path),
             "max_chars": diff_max_chars,
@@ -642,8 +950,7 @@ def main() -> int:
         }
 
         reviewer_input = _build_reviewer_input(
-            architecture,
-            conventions,
+            project,
             task_text,
             plan_text,
             reviewer_red_flags,
@@ -651,16 +958,17 @@ def main() -> int:
             tool_outputs,
             implementer_report,
         )
-        reviewer_report, review_error, reviewer_meta = _safe_run(
+        reviewer_report, review_error, reviewer_meta = await _safe_run_async(
             reviewer,
             reviewer_input,
-            artifacts["max_turns"]["reviewer"],
+            max_turns["reviewer"],
             role="reviewer",
         )
         round_record["reviewer_run"] = reviewer_meta
         if review_error:
             artifacts["error"] = f"Reviewer failed: {review_error}"
-            artifacts["rounds"].append(round_record)
+            round_record["elapsed_ns"] = time.monotonic_ns() - round_start_ns
+            rounds.append(round_record)
             report.write_artifacts(artifacts)
             print(f"Round {round_idx}: FAIL SKIP")
             print("Verdict: FAIL")
@@ -678,9 +986,14 @@ def main() -> int:
                 "fixes": review_decision.fixes,
             },
         })
-        artifacts["rounds"].append(round_record)
+        round_record["elapsed_ns"] = time.monotonic_ns() - round_start_ns
+        rounds.append(round_record)
+        # Checkpoint every round; flush() raises writer errors (missing dir, ENOSPC) before more LLM spend.
+        report.write_artifacts(artifacts)
+        report.flush()
 
-        if is_stuck(previous_reviewer_text, reviewer_report):
+        current_reviewer_hash = review_hash(reviewer_report)
+        if is_stuck_hash(previous_reviewer_hash, current_reviewer_hash):
             review_decision = ReviewDecision(
                 verdict="FAIL",
                 action="SKIP",
@@ -694,7 +1007,7 @@ def main() -> int:
             loop_exhausted = False
             break
 
-        previous_reviewer_text = reviewer_report
+        previous_reviewer_hash = current_reviewer_hash if reviewer_report else None
 
         if review_decision.verdict == "PASS":
             print(f"Round {round_idx}: PASS")
@@ -725,12 +1038,13 @@ def main() -> int:
             fs_base=repo_root / "project",
             allow_write=True,
             shell_cwd=repo_root / "workspace",
+            event_sink=report.event_sink("tech_writer", None),
         )
-        tech_input = _build_tech_writer_input(vision, architecture, conventions, task_text, plan_text, review_decision)
-        tech_report, tech_error, tech_meta = _safe_run(
+        tech_input = _build_tech_writer_input(project, task_text, plan_text, review_decision)
+        tech_report, tech_error, tech_meta = await _safe_run_async(
             tech_writer,
             tech_input,
-            artifacts["max_turns"]["tech_writer"],
+            max_turns["tech_writer"],
             context=tech_ctx,
             role="tech_writer",
         )
@@ -758,5 +1072,9 @@ def main() -> int:
     return 0
 
 
+def main() -> int:
+    return asyncio.run(main_async())
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+from collections import deque
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Deque, Dict, List, Optional, TypedDict
+
+# Per-context cap on tool events kept in memory (and in artifacts.json); older ones are
+# evicted and counted in events_dropped. event_sink, when set, still receives every event.
+TOOL_EVENTS_MAX = 10_000
 
 
 @dataclass
@@ -12,4 +17,56 @@ class RunContext:
     fs_base: Path
     allow_write: bool
     shell_cwd: Path
-    tool_events: List[Dict[str, Any]] = field(default_factory=list)
+    tool_events: Deque[Dict[str, Any]] = field(default_factory=lambda: deque(maxlen=TOOL_EVENTS_MAX))
+    event_sink: Optional[Callable[[Dict[str, Any]], None]] = field(default=None, repr=False)
+    events_dropped: int = field(default=0, init=False)
+    # Resolved once per context; fs tools compare every target against these.
+    fs_base_resolved: Path = field(init=False, repr=False)
+    reports_dir_resolved: Path = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.fs_base_resolved = self.fs_base.resolve()
+        self.reports_dir_resolved = (self.repo_root / "project" / "reports").resolve()
+
+    def record_event(self, payload: Dict[str, Any]) -> None:
+        if len(self.tool_events) == self.tool_events.maxlen:
+            self.events_dropped += 1
+        self.tool_events.append(payload)
+        if self.event_sink is not None:
+            self.event_sink(payload)
+
+
+@dataclass(frozen=True)
+class ProjectContext:
+    """project/ documents shared by every prompt, stripped once at load time."""
+
+    vision: str
+    architecture: str
+    conventions: str
+
+    @classmethod
+    def from_texts(cls, *, vision: str, architecture: str, conventions: str) -> ProjectContext:
+        return cls(vision=vision.strip(), architecture=architecture.strip(), conventions=conventions.strip())
+
+
+class Artifacts(TypedDict, total=False):
+    """Shape of the artifacts.json summary written for every run."""
+
+    run_dir: str
+    started_at: str
+    ended_at: str
+    task_source: str
+    models: Dict[str, str]
+    max_turns: Dict[str, int]
+    backlog_included: bool
+    backlog_max_chars: int
+    planner_run: Dict[str, Any]
+    plan_path: str
+    rounds: List[Dict[str, Any]]
+    stuck: bool
+    reason: str
+    tech_writer_run: Dict[str, Any]
+    docs_updated: bool
+    final_verdict: str
+    final_action: str
+    error: str
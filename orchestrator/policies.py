@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import hashlib
 import os
 from dataclasses import dataclass
-from typing import List
+from functools import lru_cache
+from typing import List, Optional
 
 MAX_ROUNDS = 8
 
+MAX_PARALLEL_AGENTS = 3
+
 DEFAULT_MAX_TURNS = {
     "planner": 6,
     "implementer": 80,
@@ -21,6 +25,7 @@ ROLE_MAX_TURNS_ENVS = {
 }
 
 
+@lru_cache(maxsize=None)
 def max_turns_for_role(role: str) -> int:
     env_var = ROLE_MAX_TURNS_ENVS.get(role)
     if env_var:
@@ -49,6 +54,7 @@ ROLE_MODEL_ENVS = {
 }
 
 
+@lru_cache(maxsize=None)
 def model_for_role(role: str) -> str:
     env_var = ROLE_MODEL_ENVS.get(role)
     if env_var:
@@ -73,6 +79,7 @@ ROLE_RETRY_MAX_ATTEMPTS_ENVS = {
 }
 
 
+@lru_cache(maxsize=None)
 def retry_max_attempts_for_role(role: str) -> int:
     env_var = ROLE_RETRY_MAX_ATTEMPTS_ENVS.get(role)
     if env_var:
@@ -82,6 +89,7 @@ def retry_max_attempts_for_role(role: str) -> int:
     return int(os.environ.get("ORCH_RETRY_MAX_ATTEMPTS", DEFAULT_RETRY_MAX_ATTEMPTS.get(role, 3)))
 
 
+@lru_cache(maxsize=None)
 def retry_base_delay_seconds() -> float:
     value = os.environ.get("ORCH_RETRY_BASE_DELAY_SECONDS", "1")
     try:
@@ -90,6 +98,7 @@ def retry_base_delay_seconds() -> float:
         return 1.0
 
 
+@lru_cache(maxsize=None)
 def retry_max_delay_seconds() -> float:
     value = os.environ.get("ORCH_RETRY_MAX_DELAY_SECONDS", "8")
     try:
@@ -97,11 +106,28 @@ def retry_max_delay_seconds() -> float:
     except ValueError:
         return 8.0
 
+
+def clear_config_cache() -> None:
+    """
+    Role settings above are read from the environment once per process (main() loads .env
+    before the first lookup); call this after changing ORCH_* variables to re-read them.
+    """
+    for cached in (
+        max_turns_for_role,
+        model_for_role,
+        retry_max_attempts_for_role,
+        retry_base_delay_seconds,
+        retry_max_delay_seconds,
+    ):
+        cached.cache_clear()
+
+
 PLAN_FILENAME = "plan.txt"
 IMPLEMENTER_FILENAME = "implementer.txt"
 REVIEWER_FILENAME = "reviewer.txt"
 TECH_WRITER_FILENAME = "tech_writer.txt"
 ARTIFACTS_FILENAME = "artifacts.json"
+EVENTS_FILENAME = "events.jsonl"
 
 
 @dataclass
@@ -124,16 +150,19 @@ def parse_reviewer_output(text: str) -> ReviewDecision:
         line = line.strip()
         if not line:
             continue
-        if line.upper().startswith("VERDICT:"):
-            verdict = line.split(":", 1)[1].strip().upper()
-        elif line.upper().startswith("ACTION:"):
-            action = line.split(":", 1)[1].strip().upper()
+        upper = line.upper()
+        if upper.startswith("VERDICT:"):
+            verdict = upper.split(":", 1)[1].strip()
+        elif upper.startswith("ACTION:"):
+            action = upper.split(":", 1)[1].strip()
         elif line.startswith("-"):
             fixes.append(line.lstrip("- ").strip())
     return ReviewDecision(verdict=verdict, action=action, fixes=fixes, raw=text)
 
 
-def is_stuck(prev_review: str, current_review: str) -> bool:
-    if not prev_review:
-        return False
-    return normalize_review(prev_review) == normalize_review(current_review)
+def review_hash(text: str) -> bytes:
+    return hashlib.blake2b(normalize_review(text).encode("utf-8"), digest_size=16).digest()
+
+
+def is_stuck_hash(prev_hash: Optional[bytes], current_hash: bytes) -> bool:
+    return prev_hash is not None and prev_hash == current_hash
@@ -1,18 +1,37 @@
 from __future__ import annotations
 
-import json
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Iterable, Mapping, Optional
 
-from .policies import ARTIFACTS_FILENAME, IMPLEMENTER_FILENAME, PLAN_FILENAME, REVIEWER_FILENAME, TECH_WRITER_FILENAME
-from .utils import ensure_dir
+from .async_writer import AsyncArtifactWriter
+from .policies import (
+    ARTIFACTS_FILENAME,
+    EVENTS_FILENAME,
+    IMPLEMENTER_FILENAME,
+    PLAN_FILENAME,
+    REVIEWER_FILENAME,
+    TECH_WRITER_FILENAME,
+)
+from .utils import dumps_json_bytes
+
+
+def _dump_artifacts(data: Mapping[str, Any]) -> bytes:
+    return dumps_json_bytes(data, pretty=True)
+
+
+def _dump_event_lines(role: str, round_idx: Optional[int], events: Iterable[Mapping[str, Any]]) -> bytes:
+    return b"".join(dumps_json_bytes({"role": role, "round": round_idx, **event}) + b"\n" for event in events)
 
 
 @dataclass
 class RunReport:
     run_dir: Path
+    # Round logs and artifacts.json are buffered on a background thread; plan and
+    # tech writer output stay synchronous. close() must run before the process exits.
+    writer: AsyncArtifactWriter = field(default_factory=AsyncArtifactWriter, repr=False)
 
     @property
     def plan_path(self) -> Path:
@@ -34,35 +53,54 @@ class RunReport:
     def artifacts_path(self) -> Path:
         return self.run_dir / ARTIFACTS_FILENAME
 
+    @property
+    def events_path(self) -> Path:
+        return self.run_dir / EVENTS_FILENAME
+
     def write_plan(self, content: str) -> None:
         self.plan_path.write_text(content.strip() + "\n", encoding="utf-8")
 
     def append_implementer(self, round_idx: int, content: str) -> None:
-        _append_round(self.implementer_path, round_idx, content)
+        self.writer.append(self.implementer_path, _round_block(round_idx, content))
 
     def append_reviewer(self, round_idx: int, content: str) -> None:
-        _append_round(self.reviewer_path, round_idx, content)
+        self.writer.append(self.reviewer_path, _round_block(round_idx, content))
 
     def write_tech_writer(self, content: str) -> None:
         self.tech_writer_path.write_text(content.strip() + "\n", encoding="utf-8")
 
-    def write_artifacts(self, data: Dict[str, Any]) -> None:
-        self.artifacts_path.write_text(
-            json.dumps(data, indent=2, sort_keys=True),
-            encoding="utf-8",
-        )
+    def append_events(self, role: str, round_idx: Optional[int], events: Iterable[Mapping[str, Any]]) -> None:
+        # One JSON object per tool call; the writer's buffered handle coalesces the appends.
+        data = _dump_event_lines(role, round_idx, events)
+        if data:
+            self.writer.append(self.events_path, data)
+
+    def event_sink(self, role: str, round_idx: Optional[int]) -> Callable[[Mapping[str, Any]], None]:
+        """RunContext.event_sink that streams each tool event to events.jsonl as it happens."""
+        return lambda event: self.append_events(role, round_idx, (event,))
+
+    def write_artifacts(self, data: Mapping[str, Any]) -> None:
+        self.writer.replace(self.artifacts_path, _dump_artifacts(data))
+
+    def flush(self) -> None:
+        self.writer.flush()
+
+    def close(self) -> None:
+        self.writer.close()
 
 
 def create_run_dir(reports_root: Path) -> Path:
-    ensure_dir(reports_root)
     timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
     run_dir = reports_root / f"run-{timestamp}"
-    ensure_dir(run_dir)
-    return run_dir
-
-
-def _append_round(path: Path, round_idx: int, content: str) -> None:
-    header = f"=== ROUND {round_idx} ===\n"
-    with path.open("a", encoding="utf-8") as handle:
-        handle.write(header)
-        handle.write(content.strip() + "\n\n")
+    while True:
+        try:
+            # parents=True also creates reports_root on the first run.
+            run_dir.mkdir(parents=True, exist_ok=False)
+            return run_dir
+        except FileExistsError:
+            # Another run started within the same second; never share its directory.
+            run_dir = reports_root / f"run-{timestamp}-{time.time_ns() % 1_000_000_000:09d}"
+
+
+def _round_block(round_idx: int, content: str) -> bytes:
+    return f"=== ROUND {round_idx} ===\n{content.strip()}\n\n".encode("utf-8")
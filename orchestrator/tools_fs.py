@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-import json
+import os
+import stat
 from pathlib import Path
 from typing import Any, Dict
 
@@ -8,44 +9,58 @@ from agents import function_tool
 from agents.tool_context import ToolContext
 
 from .models import RunContext
+from .utils import dumps_json
 
 
-def _resolve_path(base: Path, rel_path: str) -> Path:
+def _resolve_path(ctx: RunContext, rel_path: str) -> Path:
     if rel_path is None or rel_path == "":
         raise ValueError("Path is required")
     if rel_path.startswith("~"):
         raise ValueError("Tilde paths are not allowed")
     candidate = Path(rel_path)
-    if candidate.parts and candidate.parts[0] == base.name:
+    if candidate.parts and candidate.parts[0] == ctx.fs_base.name:
         candidate = Path(*candidate.parts[1:]) if len(candidate.parts) > 1 else Path(".")
     if candidate.is_absolute():
         raise ValueError("Absolute paths are not allowed")
-    resolved = (base / candidate).resolve()
-    base_resolved = base.resolve()
-    try:
-        resolved.relative_to(base_resolved)
-    except ValueError as exc:
-        raise ValueError("Path escapes the allowed base directory") from exc
+    # Resolved on every call: a symlink created since the last call must still be caught.
+    resolved = (ctx.fs_base_resolved / candidate).resolve()
+    if not _is_within(resolved, ctx.fs_base_resolved):
+        raise ValueError("Path escapes the allowed base directory")
     return resolved
 
 
+def _read_utf8(path: Path) -> str:
+    # One open/fstat/read on a raw fd; same result as read_text(), newline translation included.
+    # O_BINARY: a text-mode fd on Windows would stop reading at the first Ctrl-Z (\x1a).
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0) | getattr(os, "O_CLOEXEC", 0))
+    try:
+        size = os.fstat(fd).st_size
+        chunks = [os.read(fd, max(size, 1 << 16))]
+        while chunks[-1]:
+            chunks.append(os.read(fd, 1 << 16))
+    finally:
+        os.close(fd)
+    text = b"".join(chunks).decode("utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
 def _log_event(ctx: RunContext, payload: Dict[str, Any]) -> None:
-    ctx.tool_events.append(payload)
+    ctx.record_event(payload)
 
 
 def _is_within(path: Path, parent: Path) -> bool:
-    try:
-        path.relative_to(parent)
-        return True
-    except ValueError:
-        return False
+    # Callers pass resolved paths, so a component-aligned string prefix test is enough.
+    path_str, parent_str = str(path), str(parent)
+    return path_str == parent_str or path_str.startswith(parent_str.rstrip(os.sep) + os.sep)
 
 
 @function_tool
 def fs_read(context: ToolContext[RunContext], path: str) -> str:
     ctx = context.context
-    target = _resolve_path(ctx.fs_base, path)
-    content = target.read_text(encoding="utf-8")
+    target = _resolve_path(ctx, path)
+    content = _read_utf8(target)
     _log_event(ctx, {"tool": "fs_read", "path": str(target)})
     return content
 
@@ -55,26 +70,29 @@ def fs_write(context: ToolContext[RunContext], path: str, content: str) -> str:
     ctx = context.context
     if not ctx.allow_write:
         raise PermissionError("Write access is not allowed for this role")
-    target = _resolve_path(ctx.fs_base, path)
+    target = _resolve_path(ctx, path)
     if ctx.role == "tech_writer":
-        reports_dir = (ctx.repo_root / "project" / "reports").resolve()
-        if _is_within(target.resolve(), reports_dir):
+        if _is_within(target, ctx.reports_dir_resolved):
             raise PermissionError("project/reports is write-protected for this role")
+    data = content.encode("utf-8")
     target.parent.mkdir(parents=True, exist_ok=True)
-    target.write_text(content, encoding="utf-8")
-    _log_event(ctx, {"tool": "fs_write", "path": str(target), "bytes": len(content.encode("utf-8"))})
-    return json.dumps({"ok": True, "path": str(target)})
+    target.write_bytes(data)
+    _log_event(ctx, {"tool": "fs_write", "path": str(target), "bytes": len(data)})
+    return dumps_json({"ok": True, "path": str(target)})
 
 
 @function_tool
 def fs_list(context: ToolContext[RunContext], path: str = ".") -> str:
     ctx = context.context
-    target = _resolve_path(ctx.fs_base, path)
-    if not target.exists():
-        raise FileNotFoundError(f"Path does not exist: {target}")
-    if target.is_file():
-        listing = [target.name]
+    target = _resolve_path(ctx, path)
+    try:
+        target_stat = target.stat()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Path does not exist: {target}") from None
+    if stat.S_ISDIR(target_stat.st_mode):
+        with os.scandir(target) as entries:
+            listing = sorted(entry.name for entry in entries)
     else:
-        listing = sorted([child.name for child in target.iterdir()])
+        listing = [target.name]
     _log_event(ctx, {"tool": "fs_list", "path": str(target), "count": len(listing)})
-    return json.dumps({"path": str(target), "entries": listing})
+    return dumps_json({"path": str(target), "entries": listing})
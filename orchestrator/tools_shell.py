@@ -1,14 +1,23 @@
 from __future__ import annotations
 
-import json
 import re
+import shlex
 import subprocess
-from typing import Any, Dict
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AnyStr, Dict
 
 from agents import function_tool
 from agents.tool_context import ToolContext
 
 from .models import RunContext
+from .utils import dumps_json
+
+try:
+    import hyperscan
+except ImportError:  # pragma: no cover - optional speedup
+    hyperscan = None
 
 BLOCK_PATTERNS = [
     r"\bpip\s+install\b",
@@ -27,10 +36,6 @@ BLOCK_PATTERNS = [
     r"\bapt-get\s+install\b",
 ]
 
-BLOCK_RE = re.compile("|".join(BLOCK_PATTERNS), re.IGNORECASE)
-
-HEREDOC_START_RE = re.compile(r"<<-?\s*(['\"]?)([A-Za-z0-9_]+)\1")
-
 ESCAPE_PATTERNS = [
     r"(^|[;&|]\s*|\s)cd\s",  # cwd changes (can escape workspace/)
     r"\.\./",  # parent traversal
@@ -39,7 +44,83 @@ ESCAPE_PATTERNS = [
     r"(?:^|\s)~",  # home expansion
 ]
 
-ESCAPE_RE = re.compile("|".join(ESCAPE_PATTERNS), re.IGNORECASE)
+
+# str regexes treat \x1c-\x1f as whitespace (\s) even in ASCII text; bytes regexes and Hyperscan
+# don't. Mapping them to spaces in the scanned bytes lets the unchanged patterns give identical verdicts.
+_ASCII_WHITESPACE = bytes.maketrans(b"\x1c\x1d\x1e\x1f", b"    ")
+
+
+def _ascii_bytes(text: str) -> bytes:
+    return text.encode("ascii").translate(_ASCII_WHITESPACE)
+
+
+def _ascii_alternation(patterns: list[str]) -> bytes:
+    return "|".join(patterns).encode("ascii")
+
+
+def _compile_hyperscan(patterns: list[str]) -> Any:
+    expressions = [pattern.encode("ascii") for pattern in patterns]
+    flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH
+    database = hyperscan.Database()
+    database.compile(
+        expressions=expressions,
+        ids=list(range(len(expressions))),
+        elements=len(expressions),
+        flags=[flags] * len(expressions),
+    )
+    return database
+
+
+@dataclass(frozen=True)
+class _ShellGuards:
+    """Every compiled command guard, built once at import and shared by all run_cmd calls."""
+
+    block_re: re.Pattern[str]
+    escape_re: re.Pattern[str]
+    heredoc_start_re: re.Pattern[str]
+    # Bytes twins of the two guards above for ASCII commands (all of the patterns are ASCII).
+    block_bre: re.Pattern[bytes]
+    escape_bre: re.Pattern[bytes]
+    # Hyperscan DFA databases when the library is installed, otherwise the re path is used.
+    block_hs: Any = None
+    escape_hs: Any = None
+
+    @classmethod
+    def compile(cls) -> _ShellGuards:
+        block_hs = escape_hs = None
+        if hyperscan is not None:
+            try:
+                block_hs = _compile_hyperscan(BLOCK_PATTERNS)
+                escape_hs = _compile_hyperscan(ESCAPE_PATTERNS)
+            except hyperscan.error:  # pragma: no cover - unsupported pattern or platform
+                block_hs = escape_hs = None
+        return cls(
+            block_re=re.compile("|".join(BLOCK_PATTERNS), re.IGNORECASE),
+            escape_re=re.compile("|".join(ESCAPE_PATTERNS), re.IGNORECASE),
+            heredoc_start_re=re.compile(r"<<-?\s*(['\"]?)([A-Za-z0-9_]+)\1"),
+            block_bre=re.compile(_ascii_alternation(BLOCK_PATTERNS), re.IGNORECASE),
+            escape_bre=re.compile(_ascii_alternation(ESCAPE_PATTERNS), re.IGNORECASE),
+            block_hs=block_hs,
+            escape_hs=escape_hs,
+        )
+
+
+_GUARDS = _ShellGuards.compile()
+
+# Anything /bin/sh would interpret beyond splitting words: operators, quoting, expansion,
+# globbing, comments and line breaks. Commands without these can be exec'd directly.
+SHELL_META_RE = re.compile(r"[;&|<>()$`\\\"'*?\[\]{}~#!\n\r]")
+
+# Builtins and keywords that only exist inside a shell (or behave differently outside one).
+SHELL_BUILTINS = frozenset(
+    {
+        ".", ":", "alias", "bg", "break", "case", "cd", "command", "continue", "do", "done",
+        "elif", "else", "esac", "eval", "exec", "exit", "export", "fg", "fi", "for", "function",
+        "getopts", "hash", "if", "jobs", "local", "read", "readonly", "return", "set", "shift",
+        "source", "then", "time", "times", "trap", "type", "ulimit", "umask", "unalias", "unset",
+        "until", "wait", "while",
+    }
+)
 
 STDIO_LIMIT = 4000
 
@@ -53,7 +134,7 @@ def _truncate(text: str) -> str:
 
 
 def _log_event(ctx: RunContext, payload: Dict[str, Any]) -> None:
-    ctx.tool_events.append(payload)
+    ctx.record_event(payload)
 
 
 def _strip_heredoc_bodies(cmd: str) -> str:
@@ -61,51 +142,109 @@ def _strip_heredoc_bodies(cmd: str) -> str:
     Remove heredoc bodies from the command string so safety regex checks don't
     falsely match inside the heredoc content (which isn't interpreted by the shell).
     """
-    lines = cmd.splitlines()
+    if "<<" not in cmd:
+        return cmd
+
     out_lines: list[str] = []
-    active_delim: str | None = None
+    # Bodies follow the command line in the order their operators appear (`cat <<A <<B`).
+    pending: deque[str] = deque()
 
-    for line in lines:
-        if active_delim is not None:
-            if line.strip() == active_delim:
-                active_delim = None
+    for line in cmd.splitlines(keepends=True):
+        if pending:
+            if line.strip() == pending[0]:
+                pending.popleft()
             continue
 
         out_lines.append(line)
-        match = HEREDOC_START_RE.search(line)
-        if match:
-            active_delim = match.group(2)
+        pending.extend(match.group(2) for match in _GUARDS.heredoc_start_re.finditer(line))
+
+    return "".join(out_lines)
 
-    return "\n".join(out_lines)
+
+def _blocked_reason(cmd: str) -> str | None:
+    """
+    Returns "install" or "escape" if the command must be blocked, otherwise None.
+    Install patterns are checked against the full command (a heredoc fed to a shell
+    still runs), escape patterns only outside heredoc bodies; install wins when both match.
+    """
+    scan_cmd = _strip_heredoc_bodies(cmd)
+    guards = _GUARDS
+    if not cmd.isascii():
+        # Non-ASCII input keeps the str regexes, whose \s and \b are Unicode-aware.
+        return _classify(guards.block_re, guards.escape_re, cmd, scan_cmd)
+    cmd_bytes = _ascii_bytes(cmd)
+    scan_bytes = cmd_bytes if scan_cmd is cmd else _ascii_bytes(scan_cmd)
+    if guards.block_hs is not None:
+        return _blocked_reason_hyperscan(guards, cmd_bytes, scan_bytes)
+    return _classify(guards.block_bre, guards.escape_bre, cmd_bytes, scan_bytes)
+
+
+def _classify(block: re.Pattern[AnyStr], escape: re.Pattern[AnyStr], cmd: AnyStr, scan_cmd: AnyStr) -> str | None:
+    if block.search(cmd):
+        return "install"
+    return "escape" if escape.search(scan_cmd) else None
+
+
+def _stop_scan(pattern_id: int, start: int, end: int, flags: int, context: Any) -> bool:
+    return True  # terminate at the first match
+
+
+def _hyperscan_hit(database: Any, data: bytes) -> bool:
+    try:
+        database.scan(data, match_event_handler=_stop_scan)
+    except hyperscan.ScanTerminated:
+        return True
+    return False
+
+
+def _blocked_reason_hyperscan(guards: _ShellGuards, cmd: bytes, scan_cmd: bytes) -> str | None:
+    if _hyperscan_hit(guards.block_hs, cmd):
+        return "install"
+    return "escape" if _hyperscan_hit(guards.escape_hs, scan_cmd) else None
+
+
+def _shell_free_argv(cmd: str) -> list[str] | None:
+    """argv for commands that need no shell features, so they skip the extra /bin/sh process."""
+    if SHELL_META_RE.search(cmd):
+        return None
+    argv = shlex.split(cmd)
+    if not argv or "=" in argv[0] or argv[0] in SHELL_BUILTINS:
+        return None
+    return argv
+
+
+def _spawn(cmd: str, cwd: Path, timeout_seconds: int) -> subprocess.CompletedProcess[str]:
+    argv = _shell_free_argv(cmd)
+    if argv is not None:
+        try:
+            return subprocess.run(argv, cwd=str(cwd), capture_output=True, text=True, timeout=timeout_seconds)
+        except OSError:
+            pass  # not found / not executable: let /bin/sh report it (127/126) as it always has
+    return subprocess.run(
+        cmd,
+        cwd=str(cwd),
+        shell=True,
+        capture_output=True,
+        text=True,
+        timeout=timeout_seconds,
+    )
 
 
 @function_tool
 def run_cmd(context: ToolContext[RunContext], cmd: str, timeout_seconds: int = 30) -> str:
     ctx = context.context
-    if BLOCK_RE.search(cmd):
+    blocked_reason = _blocked_reason(cmd)
+    if blocked_reason is not None:
         payload = {"cmd": cmd, "returncode": 126, "stdout": "", "stderr": "BLOCKED"}
-        _log_event(ctx, {"tool": "run_cmd", **payload, "blocked": True, "blocked_reason": "install"})
-        return json.dumps(payload)
-
-    scan_cmd = _strip_heredoc_bodies(cmd)
-    if ESCAPE_RE.search(scan_cmd):
-        payload = {"cmd": cmd, "returncode": 126, "stdout": "", "stderr": "BLOCKED"}
-        _log_event(ctx, {"tool": "run_cmd", **payload, "blocked": True, "blocked_reason": "escape"})
-        return json.dumps(payload)
+        _log_event(ctx, {"tool": "run_cmd", **payload, "blocked": True, "blocked_reason": blocked_reason})
+        return dumps_json(payload)
 
     cwd = ctx.shell_cwd
     if not cwd.exists():
         raise FileNotFoundError(f"Workspace does not exist: {cwd}")
 
     try:
-        result = subprocess.run(
-            cmd,
-            cwd=str(cwd),
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=timeout_seconds,
-        )
+        result = _spawn(cmd, cwd, timeout_seconds)
         payload = {
             "cmd": cmd,
             "returncode": result.returncode,
@@ -120,4 +259,4 @@ def run_cmd(context: ToolContext[RunContext], cmd: str, timeout_seconds: int = 3
             "stderr": _truncate(f"TIMEOUT after {timeout_seconds}s"),
         }
     _log_event(ctx, {"tool": "run_cmd", **payload, "blocked": False})
-    return json.dumps(payload)
+    return dumps_json(payload)
@@ -1,7 +1,13 @@
 from __future__ import annotations
 
+import json
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
 
 
 PLACEHOLDER_TOKENS = {"TODO"}
@@ -16,15 +22,36 @@ def read_text(path: Path, required: bool = False) -> str:
 
 
 def is_effectively_empty(text: str) -> bool:
-    if not text or not text.strip():
+    if not text:
         return True
-    lines = [line.strip() for line in text.splitlines()]
-    content = [
-        line
-        for line in lines
-        if line and not line.startswith("#") and line.upper() not in PLACEHOLDER_TOKENS
-    ]
-    return len(content) == 0
+    # Stops at the first real content line, which is usually near the top.
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("#") and line.upper() not in PLACEHOLDER_TOKENS:
+            return False
+    return True
+
+
+def dumps_json_bytes(payload: Any, *, pretty: bool = False) -> bytes:
+    """
+    UTF-8 JSON via orjson when installed, stdlib json otherwise.
+
+    pretty indents by two spaces and sorts keys (artifacts.json); the default is one compact line.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS if pretty else None)
+        except TypeError:
+            # orjson rejects lone surrogates (os.fsdecode'd non-UTF-8 file names); json escapes them.
+            pass
+    if pretty:
+        return json.dumps(payload, indent=2, sort_keys=True).encode("utf-8")
+    return json.dumps(payload).encode("utf-8")
+
+
+def dumps_json(payload: Any) -> str:
+    """Compact JSON for tool return values."""
+    return dumps_json_bytes(payload).decode("utf-8")
 
 
 def ensure_dir(path: Path) -> None:
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List
+
+import agents
+import pytest
+
+from orchestrator import llm_cache
+from orchestrator import main as orchestrator_main
+
+
+@pytest.fixture
+def cache_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setenv(llm_cache.CACHE_ENV, "1")
+    monkeypatch.setattr(llm_cache, "CACHE_DIR", tmp_path / "cache")
+    return llm_cache.CACHE_DIR
+
+
+def _fake_runner(monkeypatch: pytest.MonkeyPatch, output: str) -> List[str]:
+    calls: List[str] = []
+
+    async def run(agent, input, max_turns=10, context=None, **kwargs):
+        calls.append(input)
+        return SimpleNamespace(final_output=output)
+
+    monkeypatch.setattr(agents.Runner, "run", staticmethod(run))
+    return calls
+
+
+def _run(agent, input_text: str, role: str):
+    return asyncio.run(orchestrator_main._safe_run_async(agent, input_text, 5, role=role))
+
+
+def test_miss_writes_an_entry_and_the_repeat_is_a_hit(cache_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    agent = SimpleNamespace(model="m", instructions="i")
+    calls = _fake_runner(monkeypatch, "VERDICT: PASS")
+
+    first = _run(agent, "prompt", "reviewer")
+    second = _run(agent, "prompt", "reviewer")
+
+    assert first[:2] == second[:2] == ("VERDICT: PASS", None)
+    assert (first[2]["cache"], first[2]["attempts"]) == ("miss", 1)
+    assert (second[2]["cache"], second[2]["attempts"]) == ("hit", 0)
+    assert calls == ["prompt"]
+    assert [path.name for path in (cache_dir / "reviewer").iterdir()] == [
+        llm_cache._entry_path("reviewer", "prompt", "m\0i").name
+    ]
+
+
+@pytest.mark.parametrize("role", ["implementer", "tech_writer"])
+def test_roles_with_side_effects_bypass_the_cache(
+    cache_dir: Path, monkeypatch: pytest.MonkeyPatch, role: str
+) -> None:
+    agent = SimpleNamespace(model="m", instructions="i")
+    calls = _fake_runner(monkeypatch, "done")
+
+    results = [_run(agent, "prompt", role) for _ in range(2)]
+
+    assert calls == ["prompt", "prompt"]
+    assert all("cache" not in meta for _output, _error, meta in results)
+    assert not cache_dir.exists()
+
+
+@pytest.mark.parametrize("changed", [{"model": "other"}, {"instructions": "other"}])
+def test_changed_agent_salt_is_a_miss(cache_dir: Path, monkeypatch: pytest.MonkeyPatch, changed: dict) -> None:
+    calls = _fake_runner(monkeypatch, "PLAN:\n- ok")
+    _run(SimpleNamespace(model="m", instructions="i"), "task", "planner")
+
+    _output, _error, meta = _run(SimpleNamespace(**{"model": "m", "instructions": "i", **changed}), "task", "planner")
+
+    assert meta["cache"] == "miss"
+    assert calls == ["task", "task"]
+
+
+def test_corrupt_entry_is_a_miss(cache_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    agent = SimpleNamespace(model="m", instructions="i")
+    entry = llm_cache._entry_path("reviewer", "prompt", "m\0i")
+    entry.parent.mkdir(parents=True)
+    entry.write_bytes(b"\xff\xfe")
+    _fake_runner(monkeypatch, "VERDICT: PASS")
+
+    output, error, meta = asyncio.run(orchestrator_main._safe_run_async(agent, "prompt", 5, role="reviewer"))
+
+    assert (output, error) == ("VERDICT: PASS", None)
+    assert meta["cache"] == "miss"
+    assert meta["cache_errors"][0].startswith("get: UnicodeDecodeError")
+
+
+def test_failed_put_keeps_the_response(cache_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache_dir.parent.mkdir(parents=True, exist_ok=True)
+    cache_dir.write_text("not a directory", encoding="utf-8")
+    _fake_runner(monkeypatch, "PLAN:\n- ok")
+
+    output, error, meta = asyncio.run(
+        orchestrator_main._safe_run_async(SimpleNamespace(), "task", 5, role="planner")
+    )
+
+    assert (output, error) == ("PLAN:\n- ok", None)
+    assert meta["attempts"] == 1
+    assert any(entry.startswith("put: ") for entry in meta["cache_errors"])
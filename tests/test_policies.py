@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import pytest
+
+from orchestrator.policies import normalize_review, parse_reviewer_output
+
+
+@pytest.mark.parametrize(
+    "text, verdict, action, fixes",
+    [
+        ("\xa0VERDICT: PASS", "PASS", "CONTINUE", []),
+        ("VERDICT: FAIL\rVERDICT: PASS", "PASS", "CONTINUE", []),
+        ("ACTION: STOP\x0c- fix it", "FAIL", "STOP", ["fix it"]),
+        ("\u3000- a\u2028verdict: pass\xa0", "PASS", "CONTINUE", ["a"]),
+        ("VERD\u0130CT: PASS", "FAIL", "CONTINUE", []),
+    ],
+)
+def test_reviewer_lines_split_and_strip_like_splitlines(text: str, verdict: str, action: str, fixes: list) -> None:
+    decision = parse_reviewer_output(text)
+
+    assert (decision.verdict, decision.action, decision.fixes) == (verdict, action, fixes)
+
+
+def test_normalize_review_matches_splitlines_strip() -> None:
+    text = " VERDICT: FAIL\xa0\r\n\r\n\x0c- fix\u2028\u2029  ACTION: CONTINUE \x85"
+
+    expected = "\n".join(line.strip() for line in text.strip().splitlines() if line.strip())
+    assert normalize_review(text) == expected
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from orchestrator.async_writer import AsyncArtifactWriter
+from orchestrator.main import _compute_workspace_diff
+from orchestrator.reporting import _dump_artifacts, _dump_event_lines
+
+
+def _git(cwd: Path, *args: str) -> None:
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="needs a filesystem that accepts non-UTF-8 names")
+def test_artifacts_survive_non_utf8_file_name(tmp_path: Path) -> None:
+    # Lone surrogate, as os.fsdecode yields for Latin-1 bytes; it reaches meta via the pathspec and cwd.
+    workspace = tmp_path / os.fsdecode(b"caf\xe9")
+    workspace.mkdir()
+    _git(tmp_path, "init", "-q")
+    (workspace / os.fsdecode(b"r\xe9sum\xe9.py")).write_text("x = 1\n", encoding="utf-8")
+
+    diff, meta = _compute_workspace_diff(tmp_path, workspace)
+
+    assert b"r\\351sum\\351.py" in diff  # git C-quotes non-ASCII paths
+    data = json.loads(_dump_artifacts({"diff": {"meta": meta}}))
+    assert data["diff"]["meta"]["workspace_pathspec"] == "caf\udce9"
+
+
+def test_event_lines_survive_surrogate_escaped_names() -> None:
+    event = {"tool": "fs_list", "path": os.fsdecode(b"caf\xe9")}
+
+    line = _dump_event_lines("implementer", 1, [event])
+
+    assert json.loads(line) == {"role": "implementer", "round": 1, **event}
+
+
+def test_flush_after_close_raises_instead_of_hanging() -> None:
+    writer = AsyncArtifactWriter()
+    writer.close()
+
+    with pytest.raises(RuntimeError, match="closed"):
+        writer.flush()
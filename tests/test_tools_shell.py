@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import re
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+from orchestrator import tools_shell
+
+
+@pytest.mark.parametrize(
+    "cmd",
+    [
+        "cd src",  # builtin
+        "export X=1",  # builtin
+        "if true",  # keyword
+        "FOO=1 python app.py",  # assignment prefix
+        "ls | wc -l",
+        "echo $HOME",
+        "python -c 'print(1)'",
+        "ls *.py",
+        "pytest -q > out.txt",
+        "true && false",
+        "echo a\necho b",
+        "",
+    ],
+)
+def test_commands_needing_a_shell_have_no_direct_argv(cmd: str) -> None:
+    assert tools_shell._shell_free_argv(cmd) is None
+
+
+def test_plain_commands_are_split_into_argv() -> None:
+    assert tools_shell._shell_free_argv("python -m pytest -q tests") == ["python", "-m", "pytest", "-q", "tests"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="relies on /bin/sh exit codes")
+def test_exec_failures_fall_back_to_the_shell_exit_codes(tmp_path: Path) -> None:
+    assert tools_shell._spawn("orch-no-such-command-xyz", tmp_path, 10).returncode == 127
+
+    script = tmp_path / "script"
+    script.write_text("echo hi\n", encoding="utf-8")
+    script.chmod(0o644)
+    assert tools_shell._spawn("./script", tmp_path, 10).returncode == 126
+
+
+BLOCKED_REASON_CASES = [
+    ("cd .. && pip install requests", "install"),
+    ("pip install requests && cd ..", "install"),
+    ("cat ../x; npm install", "install"),
+    ("pip\x1cinstall requests", "install"),  # \x1c is whitespace to str regexes
+    ("PIP INSTALL requests", "install"),
+    ("cd ..", "escape"),
+    ("cat\x1f/etc/passwd", "escape"),
+    ("cat ../secret", "escape"),
+    ("ls ~", "escape"),
+    ("python -m pytest -q", None),
+    ("pip list", None),
+    ("echo pipinstall", None),
+    ("ls caf\xe9 && pip install x", "install"),  # non-ASCII keeps the str regexes
+]
+
+
+_FAKE_CASELESS = 1 << 0
+
+
+class _FakeDatabase:
+    """Stands in for hyperscan.Database: re-backed, reporting matches through the same callback."""
+
+    def compile(self, *, expressions: list, ids: list, elements: int, flags: list) -> None:
+        assert len(expressions) == len(ids) == len(flags) == elements
+        self.patterns = [
+            (pattern_id, re.compile(expression, re.IGNORECASE if flag & _FAKE_CASELESS else 0))
+            for pattern_id, expression, flag in zip(ids, expressions, flags)
+        ]
+        self.scanned: list[bytes] = []
+
+    def scan(self, data: bytes, match_event_handler) -> None:
+        assert isinstance(data, bytes)
+        self.scanned.append(data)
+        for pattern_id, pattern in self.patterns:
+            match = pattern.search(data)
+            if match and match_event_handler(pattern_id, match.start(), match.end(), 0, None):
+                raise _fake_hyperscan.ScanTerminated()
+
+
+_fake_hyperscan = types.ModuleType("hyperscan")
+_fake_hyperscan.HS_FLAG_CASELESS = _FAKE_CASELESS
+_fake_hyperscan.HS_FLAG_SINGLEMATCH = 1 << 3
+_fake_hyperscan.error = type("error", (Exception,), {})
+_fake_hyperscan.ScanTerminated = type("ScanTerminated", (_fake_hyperscan.error,), {})
+_fake_hyperscan.Database = _FakeDatabase
+
+
+@pytest.fixture(params=["re", "fake_hyperscan", "hyperscan"])
+def guards(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> tools_shell._ShellGuards:
+    if request.param == "re":
+        engine = None
+    elif request.param == "fake_hyperscan":
+        engine = _fake_hyperscan
+    else:
+        engine = pytest.importorskip("hyperscan")
+    monkeypatch.setattr(tools_shell, "hyperscan", engine)
+    compiled = tools_shell._ShellGuards.compile()
+    assert (compiled.block_hs is None) == (engine is None)
+    monkeypatch.setattr(tools_shell, "_GUARDS", compiled)
+    return compiled
+
+
+@pytest.mark.parametrize("cmd, reason", BLOCKED_REASON_CASES)
+def test_blocked_reason_prefers_install_over_escape(
+    guards: tools_shell._ShellGuards, cmd: str, reason: str | None
+) -> None:
+    assert tools_shell._blocked_reason(cmd) == reason
+
+
+def test_hyperscan_path_scans_translated_ascii_bytes(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(tools_shell, "hyperscan", _fake_hyperscan)
+    compiled = tools_shell._ShellGuards.compile()
+    monkeypatch.setattr(tools_shell, "_GUARDS", compiled)
+
+    assert tools_shell._blocked_reason("cat\x1f/etc/passwd") == "escape"
+    assert compiled.block_hs.scanned == [b"cat /etc/passwd"]
+    assert compiled.escape_hs.scanned == [b"cat /etc/passwd"]
+
+    assert tools_shell._blocked_reason("ls caf\xe9") is None  # non-ASCII never reaches hyperscan
+    assert len(compiled.block_hs.scanned) == 1
+
+
+def test_every_heredoc_body_on_a_line_is_stripped() -> None:
+    cmd = "cat <<A <<'B'\n../one\nA\ncd /etc\nB\necho done\n"
+
+    assert tools_shell._strip_heredoc_bodies(cmd) == "cat <<A <<'B'\necho done\n"
+    assert tools_shell._blocked_reason(cmd) is None
+    assert tools_shell._blocked_reason(cmd + "cd ..\n") == "escape"
+
+
+def test_install_inside_a_heredoc_is_still_blocked() -> None:
+    assert tools_shell._blocked_reason("sh <<EOF\npip install requests\nEOF\n") == "install"
@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+import json
+import os
+
+from orchestrator.utils import dumps_json
+
+
+def test_dumps_json_accepts_surrogate_escaped_names() -> None:
+    name = os.fsdecode(b"caf\xe9.py")
+    payload = {"path": ".", "entries": [{"name": name, "type": "file"}]}
+
+    assert json.loads(dumps_json(payload)) == payload
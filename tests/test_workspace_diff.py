@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import errno
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from orchestrator import main as orchestrator_main
+
+
+def _git(cwd: Path, *args: str) -> str:
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+def test_intent_to_add_spawn_failure_falls_back_to_per_file_diffs(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    _git(tmp_path, "init", "-q")
+    (workspace / "staged.py").write_text("s = 1\n", encoding="utf-8")
+    _git(tmp_path, "add", "workspace/staged.py")
+    (workspace / "a[1].py").write_text("x = 1\n", encoding="utf-8")
+
+    popen = subprocess.Popen
+
+    def fake_popen(args, *pargs, **kwargs):
+        if "--intent-to-add" in args:
+            raise OSError(errno.E2BIG, "Argument list too long")
+        return popen(args, *pargs, **kwargs)
+
+    monkeypatch.setattr(orchestrator_main.subprocess, "Popen", fake_popen)
+
+    diff, meta = orchestrator_main._compute_workspace_diff(tmp_path, workspace)
+
+    intent = next(entry for entry in meta["commands"] if "--intent-to-add" in entry["cmd"])
+    assert intent["returncode"] == 126
+    assert b"# NEW FILE (untracked)" in diff and b"a[1].py" in diff
+    assert _git(tmp_path, "status", "--porcelain") == "A  workspace/staged.py\n?? workspace/a[1].py\n"
+
+
+def test_failed_toplevel_probe_is_retried_unless_not_a_repository(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    monkeypatch.setattr(orchestrator_main, "_GIT_TOPLEVEL_CACHE", {})
+    run_local_cmd = orchestrator_main._run_local_cmd
+    timeout = {"cmd": "git rev-parse --show-toplevel", "returncode": 124, "stdout": "", "stderr": "TIMEOUT after 5s"}
+    monkeypatch.setattr(orchestrator_main, "_run_local_cmd", lambda args, **kwargs: timeout)
+
+    assert orchestrator_main._compute_workspace_diff(tmp_path, workspace)[1]["available"] is False
+    assert orchestrator_main._GIT_TOPLEVEL_CACHE == {}
+
+    monkeypatch.setattr(orchestrator_main, "_run_local_cmd", run_local_cmd)
+    _git(tmp_path, "init", "-q")
+
+    assert orchestrator_main._compute_workspace_diff(tmp_path, workspace)[1]["available"] is True
+    assert orchestrator_main._GIT_TOPLEVEL_CACHE[str(workspace)] == tmp_path.resolve()
+
+
+def test_diff_leaves_a_staged_deletion_in_the_real_index(tmp_path: Path) -> None:
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    _git(tmp_path, "init", "-q")
+    (workspace / "gone.py").write_text("g = 1\n", encoding="utf-8")
+    _git(tmp_path, "add", "workspace/gone.py")
+    _git(tmp_path, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "init")
+    _git(tmp_path, "rm", "-q", "--cached", "workspace/gone.py")
+    (workspace / "new.py").write_text("n = 1\n", encoding="utf-8")
+    index = tmp_path / ".git" / "index"
+    index_before = index.read_bytes()
+
+    diff, _meta = orchestrator_main._compute_workspace_diff(tmp_path, workspace)
+
+    assert b"# GIT DIFF (workspace, including untracked files)" in diff and b"new.py" in diff
+    assert index.read_bytes() == index_before
+    assert _git(tmp_path, "status", "--porcelain", "--untracked-files=all") == (
+        "D  workspace/gone.py\n?? workspace/gone.py\n?? workspace/new.py\n"
+    )
+
+
+def test_scoped_diff_falls_back_to_the_whole_workspace(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    _git(tmp_path, "init", "-q")
+    (workspace / "written.py").write_text("w = 1\n", encoding="utf-8")
+    (workspace / "by_shell.py").write_text("s = 1\n", encoding="utf-8")
+    written = [str(workspace / "written.py")]
+
+    diff, meta = orchestrator_main._compute_workspace_diff(tmp_path, workspace, written)
+    assert meta["scoped_paths"] == 1 and b"by_shell.py" not in diff
+
+    monkeypatch.setattr(orchestrator_main, "DIFF_SCOPE_MAX_PATHS", 0)
+    diff, meta = orchestrator_main._compute_workspace_diff(tmp_path, workspace, written)
+    assert meta["scope_fallback"] == "too_many_paths" and b"by_shell.py" in diff
+
+    monkeypatch.undo()
+    popen = subprocess.Popen
+
+    def fake_popen(args, *pargs, **kwargs):
+        if args[:2] == ["git", "status"] and args[-1] != "workspace":
+            raise OSError(errno.E2BIG, "Argument list too long")
+        return popen(args, *pargs, **kwargs)
+
+    monkeypatch.setattr(orchestrator_main.subprocess, "Popen", fake_popen)
+    diff, meta = orchestrator_main._compute_workspace_diff(tmp_path, workspace, written)
+    assert meta["scope_fallback"] == "scoped_command_failed"
+    assert "scoped_paths" not in meta and b"by_shell.py" in diff and b"written.py" in diff